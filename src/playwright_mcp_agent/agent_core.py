@@ -1,17 +1,39 @@
 """Core agent logic for the local LLM + MCP web research flow.
 
 This module defines the system prompt and the main agent loop that
-handles tool calling for a single user query.
+handles tool calling for a single user query, and
+:func:`prime_prompt_cache` to warm the provider's prompt cache ahead of
+the first query.
 """
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
-from typing import Any, Dict, List
+from typing import Any, AsyncIterable, Callable, Dict, List, Optional, Set, Tuple
 
-from openai import OpenAI
+import orjson
+from openai import AsyncOpenAI
+from openai.types.chat import (
+    ChatCompletionChunk,
+    ChatCompletionMessage,
+    ChatCompletionMessageFunctionToolCall,
+)
 
-from .mcp_servers import MCPServer, dispatch_tool_call
+from .cache import (
+    RESPONSE_CACHE,
+    SEMANTIC_CACHE,
+    embed_text,
+    is_cache_enabled,
+    is_prompt_priming_enabled,
+    make_cache_key,
+    semantic_cache_threshold,
+)
+from .history import history_max_tokens, truncate_history
+from .llm_client import is_anthropic_client
+from .mcp_servers import ToolsBundle, dispatch_tool_call
+from .tool_router import ROUTER_TOOL_NAMES, dispatch_router_call, resolve_call_tool
 
 logger = logging.getLogger(__name__)
 TOOL_LOG_PREVIEW_LIMIT = 200
@@ -24,21 +46,232 @@ SYSTEM_PROMPT = """
 - ブラウザやタブを閉じるツール（browser_close 等）は、ユーザーから明示的に指示があった場合を除き使用しないでください。
 """
 
+# Routes requests sharing the system prompt to the same provider-side prefix
+# cache (OpenAI ``prompt_cache_key``).
+PROMPT_CACHE_KEY = hashlib.sha1(SYSTEM_PROMPT.encode()).hexdigest()
+
 
 def _preview_text(text: str, limit: int = TOOL_LOG_PREVIEW_LIMIT) -> str:
-    """Create a single-line preview for logging."""
-    text = text.replace("\n", " ").strip()
+    """Create a single-line preview for logging.
+
+    Newlines are replaced only in the part that is kept, so long tool
+    outputs are not copied in full just to log their first characters.
+    """
+    text = text.strip()
     if len(text) <= limit:
-        return text
-    return f"{text[:limit]}...(truncated)..."
+        return text.replace("\n", " ")
+    head = text[:limit].replace("\n", " ")
+    return f"{head}...(truncated)..."
+
+
+def _system_message(anthropic: bool) -> Dict[str, Any]:
+    """Build the system message, marking it cacheable for Anthropic."""
+    if not anthropic:
+        return {"role": "system", "content": SYSTEM_PROMPT}
+    return {
+        "role": "system",
+        "content": [
+            {
+                "type": "text",
+                "text": SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ],
+    }
+
+
+class _JsonValueScanner:
+    """Detect when a JSON object or array streamed in fragments is complete.
+
+    Only brackets outside of string literals are tracked, which is enough
+    to tell that the top-level value has been closed without parsing it.
+    """
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.complete = False
+
+    def feed(self, fragment: str) -> bool:
+        """Consume ``fragment`` and return whether the value is complete."""
+        for ch in fragment:
+            if self.complete:
+                break
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+                self.started = True
+            elif ch in "}]":
+                self.depth -= 1
+                self.complete = self.started and self.depth == 0
+        return self.complete
+
+
+async def _collect_stream(
+    stream: AsyncIterable[ChatCompletionChunk],
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_tool_call: Optional[Callable[[int, Any], None]] = None,
+) -> ChatCompletionMessage:
+    """Assemble a streamed chat completion into a single assistant message.
+
+    Content deltas are forwarded to ``on_delta`` as they arrive. Tool-call
+    fragments are merged by their ``index`` so that the resulting message
+    has the same shape as a non-streamed response.
+
+    ``on_tool_call`` is called exactly once per tool call with its index and
+    tool-call object: as soon as its arguments form a complete JSON value,
+    or when the stream ends for calls whose arguments never did. This lets
+    callers start executing tools while the rest of the response is still
+    being generated.
+    """
+    content_parts: List[str] = []
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    scanners: Dict[int, _JsonValueScanner] = {}
+    emitted: Set[int] = set()
+
+    def _emit(index: int) -> None:
+        if on_tool_call is None or index in emitted:
+            return
+        emitted.add(index)
+        on_tool_call(
+            index,
+            ChatCompletionMessageFunctionToolCall.model_validate(tool_calls[index]),
+        )
+
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+            if on_delta is not None:
+                on_delta(delta.content)
+
+        for tc_delta in delta.tool_calls or []:
+            index = tc_delta.index if tc_delta.index is not None else len(tool_calls)
+            entry = tool_calls.setdefault(
+                index,
+                {
+                    "id": "",
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""},
+                },
+            )
+            if tc_delta.id:
+                entry["id"] = tc_delta.id
+            if tc_delta.function is not None:
+                if tc_delta.function.name:
+                    entry["function"]["name"] += tc_delta.function.name
+                if tc_delta.function.arguments:
+                    entry["function"]["arguments"] += tc_delta.function.arguments
+                    scanner = scanners.setdefault(index, _JsonValueScanner())
+                    if scanner.feed(tc_delta.function.arguments):
+                        _emit(index)
+
+    for index in sorted(tool_calls):
+        _emit(index)
+
+    return ChatCompletionMessage.model_validate(
+        {
+            "role": "assistant",
+            "content": "".join(content_parts) or None,
+            "tool_calls": [tool_calls[i] for i in sorted(tool_calls)] or None,
+        }
+    )
+
+
+def _assistant_message(msg: ChatCompletionMessage) -> Dict[str, Any]:
+    """Project an assistant message onto the fields sent back to the LLM.
+
+    Only ``role``, ``content`` and ``tool_calls`` are kept, and unset values
+    are omitted so that the serialized history stays byte-stable.
+    """
+    message: Dict[str, Any] = {"role": "assistant"}
+    if msg.content is not None:
+        message["content"] = msg.content
+    if msg.tool_calls:
+        message["tool_calls"] = [
+            {
+                "id": tc.id,
+                "type": "function",
+                "function": {
+                    "name": tc.function.name,
+                    "arguments": tc.function.arguments,
+                },
+            }
+            for tc in msg.tool_calls
+        ]
+    return message
+
+
+def _tool_call_key(tool_call: Any, tools: ToolsBundle) -> Optional[Tuple[str, bytes]]:
+    """Return a key identifying read-only calls with the same arguments.
+
+    ``call_tool`` requests are keyed on the tool they call, so that calls
+    made through the router are deduplicated as well. Arguments are
+    canonicalized (keys sorted, whitespace removed) so that equivalent JSON
+    objects produce the same key.
+
+    Returns:
+        Optional[Tuple[str, bytes]]: The tool name and canonical arguments,
+        or ``None`` if the called tool is not read-only.
+    """
+    resolved = resolve_call_tool(tool_call, tools)
+    if resolved is not None:
+        name, args = resolved
+        if name not in tools.read_only:
+            return None
+        return name, orjson.dumps(args, option=orjson.OPT_SORT_KEYS)
+
+    name = tool_call.function.name
+    if name not in tools.read_only:
+        return None
+    raw_args = tool_call.function.arguments or "{}"
+    try:
+        args_bytes = orjson.dumps(orjson.loads(raw_args), option=orjson.OPT_SORT_KEYS)
+    except orjson.JSONDecodeError:
+        args_bytes = raw_args.encode()
+    return name, args_bytes
+
+
+async def _run_tool_call(tool_call: Any, tools: ToolsBundle) -> str:
+    """Dispatch a single tool call and log its selection and result.
+
+    Router tools (see :mod:`playwright_mcp_agent.tool_router`) are handled
+    in-process; all other calls are routed to their MCP server.
+    """
+    tool_name = tool_call.function.name
+    raw_args = tool_call.function.arguments or "{}"
+    logger.info("Tool selected: %s args=%s", tool_name, raw_args)
+    if tool_name in ROUTER_TOOL_NAMES:
+        tool_output = await dispatch_router_call(tool_call, tools)
+    else:
+        tool_output = await dispatch_tool_call(tool_call, tools.route_table)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Tool result: %s -> %s",
+            tool_name,
+            _preview_text(tool_output),
+        )
+    return tool_output
 
 
 async def run_agent_once(
-    llm_client: OpenAI,
+    llm_client: AsyncOpenAI,
     model_name: str,
     user_query: str,
-    tools_for_llm: List[dict],
-    servers: Dict[str, MCPServer],
+    tools: ToolsBundle,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> str:
     """Run a single-agent turn for a given user query.
 
@@ -46,61 +279,186 @@ async def run_agent_once(
 
     1. Initialize a message history with a system message and the
        user's question.
-    2. Call the LLM with the provided tools.
-    3. If the LLM returns tool calls, dispatch each call to the
-       appropriate MCP server using :func:`dispatch_tool_call`.
-    4. Add the tool results as ``role=\"tool\"`` messages.
-    5. Repeat the LLM call until no more tool calls are present.
-    6. Return the final assistant message content as the answer.
+    2. Call the LLM with the provided tools, streaming the response.
+    3. If the LLM returns tool calls, dispatch them to the appropriate
+       MCP servers using :func:`dispatch_tool_call`. Each call starts as
+       soon as its arguments have been fully streamed; calls to different
+       servers run concurrently, while calls to one server run in order
+       (see :data:`playwright_mcp_agent.mcp_servers.DEFAULT_CONCURRENCY_PER_SERVER`).
+       Identical calls to read-only tools with no state-changing call
+       between them run only once.
+    4. Add the tool results as ``role=\"tool\"`` messages in the order
+       the calls were returned.
+    5. Drop the oldest tool-calling turns once the history exceeds the
+       token budget (see :func:`truncate_history`).
+    6. Repeat the LLM call until no more tool calls are present.
+    7. Return the final assistant message content as the answer.
+
+    When the response cache is enabled (see
+    :func:`playwright_mcp_agent.cache.is_cache_enabled`), a previous answer
+    for the same system prompt, query, model and tool set is returned
+    immediately without calling the LLM or any tools. If
+    ``SEMANTIC_CACHE_THRESHOLD`` is also set, near-duplicate queries are
+    answered from :data:`playwright_mcp_agent.cache.SEMANTIC_CACHE`.
 
     Args:
-        llm_client: OpenAI-compatible LLM client.
+        llm_client: Asynchronous OpenAI-compatible LLM client.
         model_name: Name of the model to use (for example, ``"llama3.1"``).
         user_query: User's input text for this turn.
-        tools_for_llm: A list of tool definitions in OpenAI's
-            function-calling format, as returned by
-            :func:`playwright_mcp_agent.mcp_servers.init_servers`.
-        servers: Mapping from server name to :class:`MCPServer`.
+        tools: Tool definitions in OpenAI's function-calling format, as
+            returned by :func:`playwright_mcp_agent.mcp_servers.init_servers`,
+            optionally wrapped by
+            :func:`playwright_mcp_agent.tool_router.with_router`. Its route
+            table maps each tool to its MCP server.
+        on_delta: Optional callback receiving assistant text fragments as
+            they are streamed. On a cache hit it is called once with the
+            cached answer.
 
     Returns:
         str: Final assistant answer text for the given query.
     """
+    cache_key = make_cache_key(SYSTEM_PROMPT, user_query, model_name, tools.json_bytes)
+    use_cache = is_cache_enabled()
+    if use_cache:
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info("Response cache hit for query: %s", _preview_text(user_query))
+            if on_delta is not None:
+                on_delta(cached)
+            return cached
+
+    threshold = semantic_cache_threshold() if use_cache else None
+    semantic_scope = make_cache_key(SYSTEM_PROMPT, "", model_name, tools.json_bytes)
+    query_embedding = None
+    if threshold is not None:
+        query_embedding = await embed_text(llm_client, user_query)
+        if query_embedding is not None:
+            cached = SEMANTIC_CACHE.lookup(semantic_scope, query_embedding, threshold)
+            if cached is not None:
+                logger.info(
+                    "Semantic cache hit for query: %s", _preview_text(user_query)
+                )
+                if on_delta is not None:
+                    on_delta(cached)
+                return cached
+
+    anthropic = is_anthropic_client(llm_client)
+    cache_kwargs: Dict[str, Any] = (
+        {} if anthropic else {"prompt_cache_key": PROMPT_CACHE_KEY}
+    )
+    max_history_tokens = history_max_tokens()
     messages: List[Dict[str, Any]] = [
-        {"role": "system", "content": SYSTEM_PROMPT},
+        _system_message(anthropic),
         {"role": "user", "content": user_query},
     ]
 
     while True:
-        resp = llm_client.chat.completions.create(
+        stream = await llm_client.chat.completions.create(
             model=model_name,
             messages=messages,
-            tools=tools_for_llm,
+            tools=tools.list_form,
             tool_choice="auto",
+            stream=True,
+            **cache_kwargs,
         )
-        msg = resp.choices[0].message
-        messages.append(msg.model_dump())
+        started: Dict[int, asyncio.Task[str]] = {}
+        by_key: Dict[Tuple[str, bytes], asyncio.Task[str]] = {}
+
+        def _start_tool_call(index: int, tool_call: Any) -> None:
+            key = _tool_call_key(tool_call, tools)
+            if key is None:
+                # A call that may change the page invalidates earlier
+                # read-only results for the calls that follow it.
+                by_key.clear()
+            elif key in by_key:
+                logger.info("Reusing duplicate tool call: %s", key[0])
+                started[index] = by_key[key]
+                return
+            task = asyncio.create_task(_run_tool_call(tool_call, tools))
+            started[index] = task
+            if key is not None:
+                by_key[key] = task
+
+        try:
+            msg = await _collect_stream(stream, on_delta, _start_tool_call)
+        except BaseException:
+            for task in started.values():
+                task.cancel()
+            raise
+        messages.append(_assistant_message(msg))
 
         tool_calls = msg.tool_calls or []
         if not tool_calls:
-            return msg.content or ""
+            answer = msg.content or ""
+            if use_cache:
+                RESPONSE_CACHE[cache_key] = answer
+            if query_embedding is not None:
+                SEMANTIC_CACHE.store(semantic_scope, query_embedding, answer)
+            return answer
+
+        results = await asyncio.gather(
+            *(started[i] for i in sorted(started)),
+            return_exceptions=True,
+        )
 
         tool_messages: List[Dict[str, Any]] = []
-        for tc in tool_calls:
-            tool_name = tc.function.name
-            raw_args = tc.function.arguments or "{}"
-            logger.info("Tool selected: %s args=%s", tool_name, raw_args)
-            tool_output = await dispatch_tool_call(tc, servers)
-            logger.info(
-                "Tool result: %s -> %s",
-                tool_name,
-                _preview_text(tool_output),
-            )
+        for tc, result in zip(tool_calls, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                result = (
+                    f"Error while executing MCP tool '{tc.function.name}': "
+                    f"{result!r}"
+                )
             tool_messages.append(
                 {
                     "role": "tool",
                     "tool_call_id": tc.id,
                     "name": tc.function.name,
-                    "content": tool_output,
+                    "content": result,
                 }
             )
         messages.extend(tool_messages)
+        truncate_history(messages, model_name, max_tokens=max_history_tokens)
+
+
+async def prime_prompt_cache(
+    llm_client: AsyncOpenAI,
+    model_name: str,
+    tools: ToolsBundle,
+) -> None:
+    """Warm the provider's prompt cache with the system prompt and tools.
+
+    Sends a one-token completion whose prefix (tool definitions and system
+    message) matches the one :func:`run_agent_once` sends, so that the
+    first real query can reuse the cached prefix. Does nothing when
+    ``AGENT_PROMPT_PRIMING`` is disabled. Failures are logged and ignored.
+
+    Args:
+        llm_client: Asynchronous OpenAI-compatible LLM client.
+        model_name: Name of the model to prime.
+        tools: Tools that will be passed to :func:`run_agent_once`.
+    """
+    if not is_prompt_priming_enabled():
+        return
+
+    anthropic = is_anthropic_client(llm_client)
+    cache_kwargs: Dict[str, Any] = (
+        {} if anthropic else {"prompt_cache_key": PROMPT_CACHE_KEY}
+    )
+    try:
+        await llm_client.chat.completions.create(
+            model=model_name,
+            messages=[
+                _system_message(anthropic),
+                {"role": "user", "content": "."},
+            ],
+            tools=tools.list_form,
+            tool_choice="none",
+            max_completion_tokens=1,
+            **cache_kwargs,
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Prompt priming failed: %r", exc)
+        return
+    logger.debug("Primed prompt cache for %s", model_name)
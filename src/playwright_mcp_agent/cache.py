@@ -0,0 +1,293 @@
+"""Response caching for the agent loop.
+
+This module defines:
+
+- :func:`is_cache_enabled` to read the ``AGENT_CACHE_ENABLED`` flag.
+- :func:`make_cache_key` to build a stable key for a single user query.
+- :data:`RESPONSE_CACHE` holding final assistant answers with TTL + LRU
+  eviction.
+- :class:`SemanticCache` and :data:`SEMANTIC_CACHE` to reuse answers for
+  near-duplicate queries based on embedding similarity.
+- :func:`semantic_cache_threshold` to read the ``SEMANTIC_CACHE_THRESHOLD``
+  setting.
+- :func:`is_prompt_priming_enabled` to read the ``AGENT_PROMPT_PRIMING``
+  flag.
+- :func:`is_tool_cache_enabled`, :func:`make_tool_cache_key` and
+  :func:`tool_result_cache` for the persistent on-disk cache of read-only
+  tool results.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, List, Optional
+
+import diskcache
+import numpy as np
+import orjson
+from cachetools import TTLCache
+from openai import AsyncOpenAI
+
+from .llm_client import EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_MAXSIZE = 1000
+RESPONSE_CACHE_TTL_SECONDS = 3600
+
+SEMANTIC_CACHE_MAXSIZE = 256
+SEMANTIC_CACHE_TTL_SECONDS = 3600
+
+TOOL_CACHE_DIR = os.path.expanduser("~/.cache/playwright_mcp_agent")
+TOOL_CACHE_TTL_SECONDS = 3600
+
+RESPONSE_CACHE: TTLCache[str, str] = TTLCache(
+    maxsize=RESPONSE_CACHE_MAXSIZE,
+    ttl=RESPONSE_CACHE_TTL_SECONDS,
+)
+
+
+def _env_flag(name: str, default: bool = True) -> bool:
+    """Return the boolean value of environment variable ``name``.
+
+    The variable is read on every call so that values loaded from ``.env``
+    are honoured. An unset or empty variable yields ``default``; any of
+    ``"0"``, ``"false"``, ``"no"`` or ``"off"`` disables it.
+    """
+    value = os.getenv(name, "").strip().lower()
+    if not value:
+        return default
+    return value not in {"0", "false", "no", "off"}
+
+
+def is_cache_enabled() -> bool:
+    """Return whether the response cache is enabled (``AGENT_CACHE_ENABLED``).
+
+    The cache is opt-in: the same text can be a browser action (for
+    example, "次のページへ") whose repetition must reach the browser again.
+    """
+    return _env_flag("AGENT_CACHE_ENABLED", default=False)
+
+
+def is_prompt_priming_enabled() -> bool:
+    """Return whether prompt cache priming is enabled (``AGENT_PROMPT_PRIMING``)."""
+    return _env_flag("AGENT_PROMPT_PRIMING")
+
+
+def is_tool_cache_enabled() -> bool:
+    """Return whether the tool result cache is enabled (``TOOL_CACHE_ENABLED``).
+
+    The cache is opt-in: element refs in a cached snapshot may not match
+    the live page.
+    """
+    return _env_flag("TOOL_CACHE_ENABLED", default=False)
+
+
+def make_cache_key(
+    system_prompt: str,
+    user_query: str,
+    model_name: str,
+    tools_json: bytes,
+) -> str:
+    """Build a cache key for a single agent run.
+
+    Args:
+        system_prompt: System prompt sent at the start of the conversation.
+        user_query: User's input text.
+        model_name: Name of the model used for the run.
+        tools_json: Serialized tool definitions passed to the LLM (see
+            :attr:`playwright_mcp_agent.mcp_servers.ToolsBundle.json_bytes`).
+            The bytes are embedded as-is, without re-serialization.
+
+    Returns:
+        str: Hex-encoded SHA-256 digest identifying the run.
+    """
+    payload = {
+        "sys": system_prompt,
+        "q": user_query,
+        "model": model_name,
+        "tools": orjson.Fragment(tools_json),
+    }
+    return hashlib.sha256(
+        orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+def semantic_cache_threshold() -> Optional[float]:
+    """Return the cosine-similarity threshold for the semantic cache.
+
+    The value is read from the ``SEMANTIC_CACHE_THRESHOLD`` environment
+    variable (for example, ``"0.92"``). The semantic cache is disabled when
+    the variable is unset, empty or not a valid number.
+    """
+    value = os.getenv("SEMANTIC_CACHE_THRESHOLD", "").strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid SEMANTIC_CACHE_THRESHOLD: %r", value)
+        return None
+
+
+async def embed_text(llm_client: AsyncOpenAI, text: str) -> Optional[np.ndarray]:
+    """Embed ``text`` with :data:`EMBEDDING_MODEL` on the LLM endpoint.
+
+    Args:
+        llm_client: OpenAI-compatible LLM client.
+        text: Text to embed.
+
+    Returns:
+        Optional[np.ndarray]: L2-normalized embedding vector, or ``None``
+        when the endpoint does not provide embeddings.
+    """
+    try:
+        resp = await llm_client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Embedding request failed: %r", exc)
+        return None
+
+    vector = np.asarray(resp.data[0].embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return None
+    return vector / norm
+
+
+@dataclass(eq=False)
+class _SemanticEntry:
+    """A single cached answer in :class:`SemanticCache`."""
+
+    scope: str
+    embedding: np.ndarray
+    answer: str
+    created_at: float
+    last_used: float
+
+
+class SemanticCache:
+    """In-memory cache matching queries by embedding similarity.
+
+    Entries expire ``ttl`` seconds after insertion. When ``maxsize`` is
+    reached, the least recently used entry is evicted. Entries are grouped
+    by a ``scope`` string (for example, a key built from the system prompt,
+    model and tool set) so that answers never leak across configurations.
+
+    Args:
+        maxsize: Maximum number of cached answers.
+        ttl: Time-to-live of each entry in seconds.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: List[_SemanticEntry] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self, now: float) -> None:
+        alive = [e for e in self._entries if now - e.created_at < self.ttl]
+        if len(alive) != len(self._entries):
+            self._entries = alive
+            self._matrix = None
+
+    def lookup(
+        self,
+        scope: str,
+        embedding: np.ndarray,
+        threshold: float,
+    ) -> Optional[str]:
+        """Return the cached answer most similar to ``embedding``.
+
+        Args:
+            scope: Scope the entry must belong to.
+            embedding: L2-normalized query embedding.
+            threshold: Minimum cosine similarity for a hit.
+
+        Returns:
+            Optional[str]: The cached answer, or ``None`` on a miss.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        if not self._entries:
+            return None
+
+        if self._matrix is None:
+            self._matrix = np.stack([e.embedding for e in self._entries])
+        if self._matrix.shape[1] != embedding.shape[0]:
+            return None
+
+        scores = self._matrix @ embedding
+        for idx in np.argsort(scores)[::-1]:
+            if scores[idx] < threshold:
+                break
+            entry = self._entries[idx]
+            if entry.scope == scope:
+                entry.last_used = now
+                return entry.answer
+        return None
+
+    def store(self, scope: str, embedding: np.ndarray, answer: str) -> None:
+        """Add an answer to the cache, evicting the LRU entry if full.
+
+        Args:
+            scope: Scope of the entry.
+            embedding: L2-normalized query embedding.
+            answer: Final assistant answer for the query.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        if len(self._entries) >= self.maxsize:
+            lru = min(self._entries, key=lambda e: e.last_used)
+            self._entries.remove(lru)
+        self._entries.append(
+            _SemanticEntry(
+                scope=scope,
+                embedding=embedding,
+                answer=answer,
+                created_at=now,
+                last_used=now,
+            )
+        )
+        self._matrix = None
+
+
+SEMANTIC_CACHE = SemanticCache(
+    maxsize=SEMANTIC_CACHE_MAXSIZE,
+    ttl=SEMANTIC_CACHE_TTL_SECONDS,
+)
+
+
+def make_tool_cache_key(tool_name: str, page_key: str, args: Any) -> str:
+    """Build a cache key for a read-only tool call.
+
+    Args:
+        tool_name: MCP name of the tool.
+        page_key: Identifier of the page the tool runs against (for
+            example, a token of the last navigation and its URL).
+        args: Tool arguments; dictionary keys are sorted.
+
+    Returns:
+        str: Hex-encoded SHA-256 digest identifying the call.
+    """
+    payload = orjson.dumps(
+        {"tool": tool_name, "page": page_key, "args": args},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def tool_result_cache() -> diskcache.Cache:
+    """Return the on-disk cache of tool results in :data:`TOOL_CACHE_DIR`.
+
+    The cache is opened on first use and shared by the whole process.
+    """
+    return diskcache.Cache(TOOL_CACHE_DIR)
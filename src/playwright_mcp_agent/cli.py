@@ -6,49 +6,98 @@ This module implements a simple interactive loop that:
 - Creates a local LLM client.
 - Reads user queries from standard input.
 - Delegates each query to :func:`run_agent_once`.
+
+It also provides :func:`batch_main`, a non-interactive runner that answers
+the queries of a JSON Lines file concurrently and can resume after a crash.
 """
 
 from __future__ import annotations
 
+import argparse
 import asyncio
+import hashlib
 import logging
+import os
+import sys
 from contextlib import AsyncExitStack
-from typing import Dict
+from typing import Any, Coroutine, Dict, List, Set, TextIO, TypeVar
+
+import orjson
+from aioconsole import ainput
+from aioconsole.stream import NonFileStreamReader, NonFileStreamWriter
 
-from .agent_core import run_agent_once
+from .agent_core import prime_prompt_cache, run_agent_once
 from .llm_client import MODEL_NAME, create_llm_client
-from .mcp_servers import MCPServer, RAW_CONFIG, build_servers, init_servers
+from .mcp_servers import (
+    MCPServer,
+    RAW_CONFIG,
+    ToolsBundle,
+    build_servers,
+    init_servers,
+    keep_servers_warm,
+)
+from .tool_router import with_router
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_CONCURRENCY = 1
+ISOLATED_FLAG = "--isolated"
 
 
-async def chat_loop(servers: Dict[str, MCPServer]) -> None:
+async def chat_loop(
+    servers: Dict[str, MCPServer],
+    full_tools: bool = False,
+) -> None:
     """Run an interactive CLI chat loop.
 
     This function:
 
     1. Creates a local LLM client.
-    2. Initializes all MCP servers and collects their tools.
-    3. Prints the list of available tools.
-    4. Repeatedly reads user input from standard input.
-    5. For each input, calls :func:`run_agent_once` and prints the answer.
+    2. Initializes all MCP servers and collects their tools, and keeps
+       the servers warm in the background. Unless ``full_tools`` is set,
+       the LLM only sees the router tools and loads schemas on demand.
+    3. Prints the list of available tools and primes the LLM's prompt
+       cache in the background while the first query is typed.
+    4. Repeatedly reads user input from standard input without blocking
+       the event loop.
+    5. For each input, calls :func:`run_agent_once` and prints the answer
+       as it is streamed.
 
     Args:
         servers: Mapping from server name to :class:`MCPServer`. The
             :attr:`MCPServer.session` field will be populated by
             :func:`init_servers` when this loop starts.
+        full_tools: Send every tool schema to the LLM on each request
+            instead of the router tools.
     """
     llm_client = create_llm_client()
 
     async with AsyncExitStack() as stack:
-        tools_for_llm = await init_servers(stack, servers)
+        stack.push_async_callback(llm_client.close)
+        tools = await init_servers(stack, servers)
+        keepalive = asyncio.create_task(keep_servers_warm(servers))
+        stack.callback(keepalive.cancel)
 
         print("=== Available MCP tools ===")
-        for t in tools_for_llm:
+        for t in tools.list_form:
             fn = t["function"]
             print(f"- {fn['name']}: {fn.get('description', '')}")
+        if not full_tools:
+            tools = with_router(tools)
+        priming = asyncio.create_task(
+            prime_prompt_cache(llm_client, MODEL_NAME, tools)
+        )
+        stack.callback(priming.cancel)
+
+        # Explicit streams keep aioconsole from attaching pipe transports to
+        # the standard streams, which would switch them to non-blocking mode
+        # and make the plain writes of the streamed answer and the log
+        # output drop data.
+        console = (NonFileStreamReader(sys.stdin), NonFileStreamWriter(sys.stdout))
 
         while True:
             try:
-                user_text = await asyncio.to_thread(input, "\nYou> ")
+                user_text = await ainput("\nYou> ", streams=console)
             except (EOFError, KeyboardInterrupt):
                 print("\nExiting.")
                 break
@@ -59,26 +108,268 @@ async def chat_loop(servers: Dict[str, MCPServer]) -> None:
                 print("Bye.")
                 break
 
-            answer = await run_agent_once(
+            print("\nAssistant>")
+            await run_agent_once(
                 llm_client=llm_client,
                 model_name=MODEL_NAME,
                 user_query=user_text,
-                tools_for_llm=tools_for_llm,
-                servers=servers,
+                tools=tools,
+                on_delta=_write_delta,
             )
-            print("\nAssistant>")
-            print(answer)
+            print()
+
+
+def _write_delta(text: str) -> None:
+    """Write a streamed text fragment to standard output immediately."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def _query_hash(query: str) -> str:
+    """Return the identifier of ``query`` used for batch resume."""
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def _record_key(record: Dict[str, Any], query_hash: str) -> str:
+    """Return the batch resume key of an input or output record.
+
+    Records are identified by their ``"id"`` when they have one, and by
+    the hash of their query otherwise.
+    """
+    if "id" in record:
+        return "id:" + orjson.dumps(record["id"]).decode()
+    return "query:" + query_hash
+
+
+def _read_done_keys(output_jsonl: str) -> Set[str]:
+    """Return resume keys of the records already answered in ``output_jsonl``."""
+    done: Set[str] = set()
+    if not os.path.exists(output_jsonl):
+        return done
+    with open(output_jsonl, "rb") as f:
+        for line in f:
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # A partially written last line from an interrupted run.
+                continue
+            if not isinstance(record, dict) or "answer" not in record:
+                continue
+            query_hash = record.get("query_hash")
+            if isinstance(query_hash, str):
+                done.add(_record_key(record, query_hash))
+    return done
+
+
+def _read_queries(input_jsonl: str) -> List[Dict[str, Any]]:
+    """Read query records (objects with a ``"query"`` key) from a file."""
+    records: List[Dict[str, Any]] = []
+    with open(input_jsonl, "rb") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            if not isinstance(record, dict) or not isinstance(
+                record.get("query"), str
+            ):
+                raise ValueError(
+                    f"{input_jsonl}:{lineno}: expected an object with a "
+                    f"string 'query' field"
+                )
+            records.append(record)
+    return records
+
+
+def _isolated_servers(servers: Dict[str, MCPServer]) -> Dict[str, MCPServer]:
+    """Return fresh copies of ``servers`` that each run their own browser.
+
+    ``--isolated`` keeps each server's browser profile in memory, so that
+    several Playwright MCP servers can run side by side without sharing a
+    profile directory.
+    """
+    return {
+        name: MCPServer(
+            name=server.name,
+            command=server.command,
+            args=(
+                server.args
+                if ISOLATED_FLAG in server.args
+                else [*server.args, ISOLATED_FLAG]
+            ),
+            env=server.env,
+        )
+        for name, server in servers.items()
+    }
+
+
+def _open_output(output_jsonl: str) -> TextIO:
+    """Open ``output_jsonl`` for appending, on a fresh line.
+
+    A crash can leave the file ending in a partial line; a newline is
+    written first so that the next record is not appended onto it.
+    """
+    needs_newline = False
+    if os.path.exists(output_jsonl) and os.path.getsize(output_jsonl) > 0:
+        with open(output_jsonl, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    out = open(output_jsonl, "a", encoding="utf-8")
+    if needs_newline:
+        out.write("\n")
+    return out
+
+
+def _append_record(out: TextIO, record: Dict[str, Any]) -> None:
+    """Append ``record`` as one JSON line and force it to disk."""
+    out.write(orjson.dumps(record).decode() + "\n")
+    out.flush()
+    os.fsync(out.fileno())
+
+
+async def batch_main(
+    servers: Dict[str, MCPServer],
+    input_jsonl: str,
+    output_jsonl: str,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    full_tools: bool = False,
+) -> None:
+    """Answer every query of a JSON Lines file.
+
+    Each input line is an object with a ``"query"`` field; any ``"id"``
+    field is copied to the output. Each answer is appended to
+    ``output_jsonl`` as soon as it is ready, as an object with
+    ``"query_hash"``, ``"query"`` and either ``"answer"`` or ``"error"``,
+    and the file is synced to disk after every line. Records that already
+    have an answer in ``output_jsonl`` (matched by ``"id"``, or by query
+    when there is no ``"id"``) are skipped, so an interrupted run can
+    simply be restarted.
+
+    An agent run drives the current page of its browser, so runs cannot
+    share MCP servers. With ``concurrency`` above 1, each worker gets its
+    own set of servers started with ``--isolated``.
+
+    Args:
+        servers: Mapping from server name to :class:`MCPServer`.
+        input_jsonl: Path of the input JSON Lines file.
+        output_jsonl: Path of the output JSON Lines file (appended to).
+        concurrency: Number of workers, each with its own MCP servers.
+        full_tools: Send every tool schema to the LLM on each request
+            instead of the router tools.
+    """
+    done = _read_done_keys(output_jsonl)
+    seen: Set[str] = set()
+    pending: List[Dict[str, Any]] = []
+    for record in _read_queries(input_jsonl):
+        key = _record_key(record, _query_hash(record["query"]))
+        if key in seen:
+            logger.warning("Batch: skipping duplicate input record %s", key)
+            continue
+        seen.add(key)
+        if key not in done:
+            pending.append(record)
+
+    logger.info("Batch: %d queries to run", len(pending))
+    if not pending:
+        return
+
+    llm_client = create_llm_client()
+    workers = max(1, min(concurrency, len(pending)))
+    queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
+    for record in pending:
+        queue.put_nowait(record)
+
+    async with AsyncExitStack() as stack:
+        stack.push_async_callback(llm_client.close)
+        worker_tools: List[ToolsBundle] = []
+        for _ in range(workers):
+            slot_servers = servers if workers == 1 else _isolated_servers(servers)
+            tools = await init_servers(stack, slot_servers)
+            worker_tools.append(tools if full_tools else with_router(tools))
+        out = stack.enter_context(_open_output(output_jsonl))
+
+        async def _worker(tools: ToolsBundle) -> None:
+            while not queue.empty():
+                record = queue.get_nowait()
+                query = record["query"]
+                result: Dict[str, Any] = {"query_hash": _query_hash(query)}
+                if "id" in record:
+                    result["id"] = record["id"]
+                result["query"] = query
+                try:
+                    result["answer"] = await run_agent_once(
+                        llm_client=llm_client,
+                        model_name=MODEL_NAME,
+                        user_query=query,
+                        tools=tools,
+                    )
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Batch query failed: %r", exc)
+                    result["error"] = repr(exc)
+                _append_record(out, result)
+
+        await asyncio.gather(*(_worker(tools) for tools in worker_tools))
+
+
+T = TypeVar("T")
+
+
+def _run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run ``coro`` on uvloop when available, else on the default loop."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+        return runner.run(coro)
 
 
 def main() -> None:
     """Entry point for the playwright-mcp-agent CLI.
 
     This function constructs the :class:`MCPServer` map from
-    :data:`RAW_CONFIG` and then runs the chat loop.
+    :data:`RAW_CONFIG` and then runs the chat loop, or the batch runner
+    when ``--batch INPUT OUTPUT`` is given, on uvloop where it is
+    installed.
     """
+    parser = argparse.ArgumentParser(prog="playwright-mcp-agent")
+    parser.add_argument(
+        "--batch",
+        nargs=2,
+        metavar=("INPUT_JSONL", "OUTPUT_JSONL"),
+        help="answer the queries in INPUT_JSONL and append results to "
+        "OUTPUT_JSONL instead of starting the interactive chat",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help="number of queries run at once in batch mode, each with its own "
+        "isolated MCP servers and browser (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--full-tools",
+        action="store_true",
+        help="send every MCP tool schema to the LLM instead of loading "
+        "schemas on demand through list_tools/call_tool (for debugging)",
+    )
+    args = parser.parse_args()
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
     servers_map = build_servers(RAW_CONFIG)
-    asyncio.run(chat_loop(servers_map))
+    if args.batch:
+        input_jsonl, output_jsonl = args.batch
+        _run(
+            batch_main(
+                servers_map,
+                input_jsonl,
+                output_jsonl,
+                concurrency=args.concurrency,
+                full_tools=args.full_tools,
+            )
+        )
+    else:
+        _run(chat_loop(servers_map, full_tools=args.full_tools))
@@ -0,0 +1,218 @@
+"""Conversation history management for the agent loop.
+
+This module defines:
+
+- :func:`history_max_tokens` to read the ``AGENT_HISTORY_MAX_TOKENS``
+  setting.
+- :func:`count_tokens` to estimate the prompt size of a message list.
+- :func:`truncate_history` to keep the message history under a token
+  budget by dropping the oldest tool-calling turns.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_MAX_TOKENS = 6000
+KEEP_RECENT_TOOL_MESSAGES = 2
+SUMMARY_PREVIEW_LIMIT = 200
+HISTORY_SUMMARY_HEADER = (
+    "History summary: older tool results were removed to save context."
+)
+# Fixed per-message overhead of the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def history_max_tokens() -> int:
+    """Return the token budget for the message history.
+
+    The value is read from the ``AGENT_HISTORY_MAX_TOKENS`` environment
+    variable and defaults to :data:`DEFAULT_HISTORY_MAX_TOKENS`.
+    """
+    value = os.getenv("AGENT_HISTORY_MAX_TOKENS", "").strip()
+    if not value:
+        return DEFAULT_HISTORY_MAX_TOKENS
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Ignoring invalid AGENT_HISTORY_MAX_TOKENS: %r", value)
+        return DEFAULT_HISTORY_MAX_TOKENS
+
+
+@lru_cache(maxsize=None)
+def _encoding_for(model_name: str) -> Optional[tiktoken.Encoding]:
+    """Return the tokenizer for ``model_name``, or ``None`` if unavailable.
+
+    Unknown models (for example, local Llama models) fall back to
+    ``cl100k_base``. ``None`` is returned when no encoding can be loaded,
+    for example when the BPE files cannot be downloaded offline.
+    """
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        pass
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to load tokenizer for %s: %r", model_name, exc)
+        return None
+
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to load cl100k_base tokenizer: %r", exc)
+        return None
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Return the text of a message that is sent to the LLM."""
+    content = message.get("content")
+    if isinstance(content, list):
+        parts = [p.get("text", "") for p in content if isinstance(p, dict)]
+    else:
+        parts = [content or ""]
+
+    for tc in message.get("tool_calls") or []:
+        fn = tc.get("function", {})
+        parts.append(fn.get("name", ""))
+        parts.append(fn.get("arguments", ""))
+    return "\n".join(parts)
+
+
+def _count_text(text: str, model_name: str) -> int:
+    """Estimate the number of tokens in ``text``."""
+    encoding = _encoding_for(model_name)
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _count_message(message: Dict[str, Any], model_name: str) -> int:
+    """Estimate the number of prompt tokens used by one message."""
+    return MESSAGE_OVERHEAD_TOKENS + _count_text(_message_text(message), model_name)
+
+
+def count_tokens(messages: List[Dict[str, Any]], model_name: str) -> int:
+    """Estimate the number of prompt tokens used by ``messages``.
+
+    Args:
+        messages: Chat Completions message history.
+        model_name: Model name used to select the tokenizer.
+
+    Returns:
+        int: Estimated token count.
+    """
+    return sum(_count_message(m, model_name) for m in messages)
+
+
+def _is_summary(message: Dict[str, Any]) -> bool:
+    content = message.get("content")
+    return (
+        message.get("role") == "system"
+        and isinstance(content, str)
+        and content.startswith(HISTORY_SUMMARY_HEADER)
+    )
+
+
+def truncate_history(
+    messages: List[Dict[str, Any]],
+    model_name: str,
+    max_tokens: int = DEFAULT_HISTORY_MAX_TOKENS,
+) -> None:
+    """Drop the oldest tool-calling turns until ``messages`` fits the budget.
+
+    The leading system and user messages are always kept. The remaining
+    history is split into turns, each made of one assistant message and the
+    tool results answering it, so that tool calls are never separated from
+    their results. Turns containing the last
+    :data:`KEEP_RECENT_TOOL_MESSAGES` tool results are kept verbatim.
+
+    Evicted tool results are recorded as one-line previews in a single
+    ``role="system"`` history summary message, created the first time a
+    turn is dropped and placed right after the user's question. The
+    summary counts against the budget too: its oldest lines are dropped
+    when the history still does not fit, so it never grows without bound.
+
+    Args:
+        messages: Message history, modified in place.
+        model_name: Model name used to select the tokenizer.
+        max_tokens: Token budget for the whole history.
+    """
+    head_end = next(
+        (i + 1 for i, m in enumerate(messages) if m.get("role") == "user"),
+        len(messages),
+    )
+    head = messages[:head_end]
+    rest = messages[head_end:]
+
+    summary_lines: List[str] = []
+    if rest and _is_summary(rest[0]):
+        summary_lines = rest[0]["content"].splitlines()[1:]
+        rest = rest[1:]
+
+    turns: List[List[Dict[str, Any]]] = []
+    for message in rest:
+        if message.get("role") == "tool" and turns:
+            turns[-1].append(message)
+        else:
+            turns.append([message])
+
+    seen_tools = 0
+    for idx in range(len(turns) - 1, -1, -1):
+        seen_tools += sum(1 for m in turns[idx] if m.get("role") == "tool")
+        if seen_tools >= KEEP_RECENT_TOOL_MESSAGES:
+            protected = len(turns) - idx
+            break
+    else:
+        protected = len(turns)
+
+    turn_tokens = [
+        sum(_count_message(m, model_name) for m in turn) for turn in turns
+    ]
+    total = count_tokens(head, model_name) + sum(turn_tokens)
+    total += _count_text("\n".join(summary_lines), model_name)
+
+    evicted = 0
+    while total > max_tokens and len(turns) - evicted > protected:
+        for message in turns[evicted]:
+            if message.get("role") != "tool":
+                continue
+            preview = " ".join(str(message.get("content", "")).split())
+            line = (
+                f"- {message.get('name', 'tool')}: "
+                f"{preview[:SUMMARY_PREVIEW_LIMIT]}"
+            )
+            summary_lines.append(line)
+            total += _count_text(line, model_name)
+        total -= turn_tokens[evicted]
+        evicted += 1
+
+    trimmed = 0
+    while total > max_tokens and trimmed < len(summary_lines):
+        total -= _count_text(summary_lines[trimmed], model_name)
+        trimmed += 1
+    if trimmed:
+        del summary_lines[:trimmed]
+
+    if not evicted and not trimmed:
+        return
+
+    logger.info(
+        "Dropped %d old turn(s) and %d summary line(s) from the message history",
+        evicted,
+        trimmed,
+    )
+    summary = {
+        "role": "system",
+        "content": "\n".join([HISTORY_SUMMARY_HEADER, *summary_lines]),
+    }
+    messages[:] = [
+        *head,
+        summary,
+        *(m for turn in turns[evicted:] for m in turn),
+    ]
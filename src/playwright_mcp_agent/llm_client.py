@@ -7,8 +7,9 @@ environment variables documented in ``.env`` let you point to any model.
 
 import os
 
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 
 load_dotenv()
@@ -17,15 +18,32 @@ load_dotenv()
 # NOTE: Defaults match the previous Ollama configuration but can be overridden
 # via the environment variables defined in .env.
 MODEL_NAME = os.getenv("MODEL_NAME", "llama3.1")
+# Embedding model used by the semantic response cache.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
 
 
-def create_llm_client() -> OpenAI:
-    """Create an OpenAI-compatible client configured via environment variables."""
+def create_llm_client() -> AsyncOpenAI:
+    """Create an OpenAI-compatible client configured via environment variables.
+
+    The client is asynchronous so that LLM round-trips do not block the
+    event loop, and it shares one HTTP/2 connection pool across requests.
+    """
 
     base_url = os.getenv("BASE_URL", "http://localhost:11434/v1")
     api_key = os.getenv("API_KEY", "ollama")
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20),
+    )
 
-    return OpenAI(
+    return AsyncOpenAI(
         base_url=base_url,
         api_key=api_key,
+        http_client=http_client,
     )
+
+
+def is_anthropic_client(client: AsyncOpenAI) -> bool:
+    """Return whether ``client`` points at Anthropic's OpenAI-compatible API."""
+
+    return "anthropic" in (client.base_url.host or "")
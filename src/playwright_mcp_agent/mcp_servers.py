@@ -3,23 +3,104 @@
 This module defines:
 
 - :class:`MCPServer` dataclass for tracking each MCP server.
+- :class:`ToolsBundle` dataclass holding the tools sent to the LLM.
 - :data:`RAW_CONFIG` for server commands and arguments.
 - :func:`build_servers` to materialize :class:`MCPServer` objects.
 - :func:`init_servers` to spawn all MCP servers and collect their tools.
-- :func:`dispatch_tool_call` to route LLM tool calls to the right server.
+- :func:`keep_servers_warm` to ping idle MCP servers periodically.
+- :func:`html_to_text` to compact HTML tool output into visible text.
+- :func:`dispatch_tool_call` to route LLM tool calls to the right server,
+  serving read-only page tools from the on-disk cache when possible.
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import uuid
+import weakref
 from contextlib import AsyncExitStack
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
 
+import orjson
+from cachetools import LRUCache
 from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
+from selectolax.lexbor import LexborHTMLParser
+
+from .cache import (
+    TOOL_CACHE_TTL_SECONDS,
+    is_tool_cache_enabled,
+    make_tool_cache_key,
+    tool_result_cache,
+)
+
+logger = logging.getLogger(__name__)
 
 TOOL_SEPARATOR = "__"
+DEFAULT_KEEPALIVE_INTERVAL_SECONDS = 60.0
+# Playwright MCP drives a single current page, so calls to one server run
+# one at a time, in the order they were issued. Calls to different servers
+# still run concurrently.
+DEFAULT_CONCURRENCY_PER_SERVER = 1
+
+# HTML tool output is reduced to its visible text; text longer than
+# HTML_TEXT_LIMIT keeps only its head and tail.
+HTML_TEXT_LIMIT = 4000
+HTML_HEAD_CHARS = 2000
+HTML_TAIL_CHARS = 1000
+_NON_VISIBLE_TAGS = ["script", "style", "noscript", "template", "svg"]
+_WHITESPACE_RE = re.compile(r"\s+")
+_HTML_TEXT_CACHE: LRUCache[str, str] = LRUCache(maxsize=128)
+
+# Read-only tools whose results depend only on the current page and their
+# arguments, and may therefore be served from the on-disk tool cache.
+CACHEABLE_TOOLS = frozenset({"browser_snapshot"})
+NAVIGATE_TOOL = "browser_navigate"
+
+# Key of the page each session's browser is known to show, unchanged since
+# it was navigated to: the URL prefixed with a token unique to that
+# navigation, so that cached results never outlive the page they were
+# taken from. Absent when the page may have been modified.
+_PAGE_KEYS: weakref.WeakKeyDictionary[ClientSession, str] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _concurrency_per_server() -> int:
+    """Return the in-flight tool call limit for a single MCP server.
+
+    The value is read from the ``MCP_CONCURRENCY_PER_SERVER`` environment
+    variable and defaults to :data:`DEFAULT_CONCURRENCY_PER_SERVER`.
+    """
+    value = os.getenv("MCP_CONCURRENCY_PER_SERVER", "").strip()
+    if not value:
+        return DEFAULT_CONCURRENCY_PER_SERVER
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning("Ignoring invalid MCP_CONCURRENCY_PER_SERVER: %r", value)
+        return DEFAULT_CONCURRENCY_PER_SERVER
+
+
+def _keepalive_interval() -> float:
+    """Return the seconds between keep-alive pings to idle MCP servers.
+
+    The value is read from the ``MCP_KEEPALIVE_INTERVAL`` environment
+    variable and defaults to :data:`DEFAULT_KEEPALIVE_INTERVAL_SECONDS`.
+    """
+    value = os.getenv("MCP_KEEPALIVE_INTERVAL", "").strip()
+    if not value:
+        return DEFAULT_KEEPALIVE_INTERVAL_SECONDS
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid MCP_KEEPALIVE_INTERVAL: %r", value)
+        return DEFAULT_KEEPALIVE_INTERVAL_SECONDS
 
 
 @dataclass
@@ -36,6 +117,8 @@ class MCPServer:
             starting the server process.
         session: Active :class:`mcp.ClientSession` instance. This is
             populated by :func:`init_servers`.
+        semaphore: Limits the number of tool calls in flight on this
+            server (``MCP_CONCURRENCY_PER_SERVER``, default 1).
     """
 
     name: str
@@ -43,6 +126,37 @@ class MCPServer:
     args: List[str]
     env: Optional[Dict[str, str]] = None
     session: Optional[ClientSession] = None
+    semaphore: asyncio.Semaphore = field(
+        default_factory=lambda: asyncio.Semaphore(_concurrency_per_server())
+    )
+
+
+@dataclass(frozen=True)
+class ToolsBundle:
+    """Tools exposed to the LLM, in list and pre-serialized form.
+
+    Attributes:
+        list_form: Tools in the OpenAI function-calling format, suitable for
+            the ``tools`` argument of ``chat.completions.create()``.
+        json_bytes: :attr:`list_form` serialized once with :mod:`orjson`,
+            for consumers that need the JSON form (for example, cache
+            keys) without re-serializing on every call.
+        route_table: Mapping from the unique tool name seen by the LLM
+            (for example, ``"playwright__browser_navigate"``) to the
+            :class:`MCPServer` exposing it and the tool's MCP name.
+        read_only: Unique names of the tools their server declares as
+            read-only (MCP ``readOnlyHint``), which are safe to run once
+            and reuse.
+        schema_by_name: Mapping from unique tool name to its ``function``
+            entry (name, description and parameter schema), used when
+            schemas are loaded on demand.
+    """
+
+    list_form: List[dict]
+    json_bytes: bytes
+    route_table: Dict[str, Tuple[MCPServer, str]]
+    read_only: FrozenSet[str] = frozenset()
+    schema_by_name: Dict[str, dict] = field(default_factory=dict)
 
 
 # Official config examples for Playwright MCP and Chrome DevTools MCP use
@@ -118,10 +232,42 @@ def mcp_tool_to_openai_tool(tool: types.Tool, server_name: str) -> dict:
     }
 
 
+async def keep_servers_warm(
+    servers: Dict[str, MCPServer],
+    interval: Optional[float] = None,
+) -> None:
+    """Ping every MCP server periodically until cancelled.
+
+    The pings keep idle stdio sessions (and the browsers behind them) alive
+    between queries without touching the current page.
+
+    Args:
+        servers: Mapping from logical server name to :class:`MCPServer`.
+        interval: Seconds between pings. Defaults to the
+            ``MCP_KEEPALIVE_INTERVAL`` environment variable, or
+            :data:`DEFAULT_KEEPALIVE_INTERVAL_SECONDS`. A value of ``0`` or
+            less disables the pings.
+    """
+    if interval is None:
+        interval = _keepalive_interval()
+    if interval <= 0:
+        return
+
+    while True:
+        await asyncio.sleep(interval)
+        for server in servers.values():
+            if server.session is None:
+                continue
+            try:
+                await server.session.send_ping()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Keep-alive ping to '%s' failed: %r", server.name, exc)
+
+
 async def init_servers(
     stack: AsyncExitStack,
     servers: Dict[str, MCPServer],
-) -> List[dict]:
+) -> ToolsBundle:
     """Initialize all MCP servers and collect their tools.
 
     This function performs the following steps for each MCP server:
@@ -132,7 +278,8 @@ async def init_servers(
     3. Run the MCP initialization handshake.
     4. Query the server for its tools via :meth:`ClientSession.list_tools`.
     5. Convert each MCP tool into an OpenAI tools entry using
-       :func:`mcp_tool_to_openai_tool`.
+       :func:`mcp_tool_to_openai_tool` and record its route for
+       :func:`dispatch_tool_call`.
 
     Args:
         stack: An :class:`AsyncExitStack` used to manage the lifetime of
@@ -140,11 +287,13 @@ async def init_servers(
         servers: Mapping from logical server name to :class:`MCPServer`.
 
     Returns:
-        List[dict]: List of tools in the OpenAI function-calling format
-        suitable for the ``tools`` argument of
-        ``chat.completions.create()``.
+        ToolsBundle: Tools in the OpenAI function-calling format, sorted by
+        function name, together with their serialized JSON and route
+        table.
     """
     openai_tools: List[dict] = []
+    route_table: Dict[str, Tuple[MCPServer, str]] = {}
+    read_only: Set[str] = set()
 
     for server in servers.values():
         read_stream, write_stream = await stack.enter_async_context(
@@ -164,16 +313,73 @@ async def init_servers(
 
         tools_result = await server.session.list_tools()
         for mcp_tool in tools_result.tools:
-            openai_tools.append(mcp_tool_to_openai_tool(mcp_tool, server.name))
+            openai_tool = mcp_tool_to_openai_tool(mcp_tool, server.name)
+            openai_tools.append(openai_tool)
+            unique_name = openai_tool["function"]["name"]
+            route_table[unique_name] = (server, mcp_tool.name)
+            if mcp_tool.annotations and mcp_tool.annotations.readOnlyHint:
+                read_only.add(unique_name)
+
+    # Keep the serialized tool list byte-stable across runs so that
+    # provider-side prompt prefix caches can be reused.
+    openai_tools.sort(key=lambda t: t["function"]["name"])
+    return ToolsBundle(
+        list_form=openai_tools,
+        json_bytes=orjson.dumps(openai_tools),
+        route_table=route_table,
+        read_only=frozenset(read_only),
+        schema_by_name={t["function"]["name"]: t["function"] for t in openai_tools},
+    )
+
+
+def _looks_like_html(text: str) -> bool:
+    """Return whether ``text`` appears to be an HTML document."""
+    return "<html" in text[:1024].lower()
+
+
+def html_to_text(raw: str) -> str:
+    """Reduce an HTML document to its visible text.
+
+    Scripts, styles and other non-visible elements are removed, runs of
+    whitespace are collapsed, and text longer than :data:`HTML_TEXT_LIMIT`
+    is shortened to its head and tail. Results are cached by the SHA-256
+    digest of ``raw`` so identical pages are parsed only once.
+
+    Args:
+        raw: HTML source returned by a tool.
+
+    Returns:
+        str: Compact visible text of the page.
+    """
+    key = hashlib.sha256(raw.encode()).hexdigest()
+    cached = _HTML_TEXT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    tree = LexborHTMLParser(raw)
+    tree.strip_tags(_NON_VISIBLE_TAGS)
+    root = tree.body if tree.body is not None else tree.root
+    text = root.text(separator=" ", strip=True) if root is not None else ""
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+
+    if len(text) > HTML_TEXT_LIMIT:
+        elided = len(text) - HTML_HEAD_CHARS - HTML_TAIL_CHARS
+        text = (
+            f"{text[:HTML_HEAD_CHARS]}...\n"
+            f"[middle elided {elided} chars]\n"
+            f"{text[-HTML_TAIL_CHARS:]}"
+        )
 
-    return openai_tools
+    _HTML_TEXT_CACHE[key] = text
+    return text
 
 
 def call_result_to_text(result: types.CallToolResult) -> str:
     """Convert an :class:`CallToolResult` into a plain text string.
 
-    Text content is concatenated in order. Non-text content is stringified
-    using :func:`str`.
+    Text content is concatenated in order, with HTML documents reduced to
+    their visible text by :func:`html_to_text`. Non-text content is
+    stringified using :func:`str`.
 
     Args:
         result: The MCP tool call result.
@@ -187,26 +393,57 @@ def call_result_to_text(result: types.CallToolResult) -> str:
     parts: List[str] = []
     for c in result.content:
         if isinstance(c, types.TextContent):
-            parts.append(c.text)
+            if _looks_like_html(c.text):
+                parts.append(html_to_text(c.text))
+            else:
+                parts.append(c.text)
         else:
             parts.append(str(c))
     return "\n".join(parts)
 
 
+def _track_page(
+    session: ClientSession,
+    tool_name: str,
+    args: Any,
+    result: types.CallToolResult,
+) -> None:
+    """Record which page ``session``'s browser shows after a tool call.
+
+    A successful :data:`NAVIGATE_TOOL` call records a new page key made of
+    a fresh token and the target URL. Any
+    other tool outside :data:`CACHEABLE_TOOLS` may have changed the page
+    (clicks, typing, ...), so the record is cleared.
+    """
+    if tool_name in CACHEABLE_TOOLS:
+        return
+    url = args.get("url") if isinstance(args, dict) else None
+    if tool_name == NAVIGATE_TOOL and isinstance(url, str) and not result.isError:
+        _PAGE_KEYS[session] = f"{uuid.uuid4().hex}:{url}"
+    else:
+        _PAGE_KEYS.pop(session, None)
+
+
 async def dispatch_tool_call(
     tool_call: Any,
-    servers: Dict[str, MCPServer],
+    route_table: Dict[str, Tuple[MCPServer, str]],
 ) -> str:
     """Dispatch a single tool call from the LLM to the correct MCP server.
 
     The tool call must come from the OpenAI function-calling API and is
     expected to have a function name in the form
-    ``\"serverName__toolName\"``.
+    ``\"serverName__toolName\"``, as listed in ``route_table``.
+
+    When the on-disk tool cache is enabled (``TOOL_CACHE_ENABLED``,
+    one-hour TTL), repeated calls to :data:`CACHEABLE_TOOLS` made after the
+    same navigation, with only such calls in between, are served from it.
 
     Args:
         tool_call: A tool call object from
             ``response.choices[0].message.tool_calls``.
-        servers: Mapping from logical server name to :class:`MCPServer`.
+        route_table: Mapping from unique tool name to the
+            :class:`MCPServer` and MCP tool name, as built by
+            :func:`init_servers` (:attr:`ToolsBundle.route_table`).
 
     Returns:
         str: The text representation of the MCP tool result, which can
@@ -214,31 +451,55 @@ async def dispatch_tool_call(
         message.
     """
     raw_name: str = tool_call.function.name
-    args_str: str = tool_call.function.arguments or "{}"
+    route = route_table.get(raw_name)
+    if route is None:
+        return f"Tool '{raw_name}' is not provided by any MCP server."
+    server, mcp_tool_name = route
 
+    args_str: str = tool_call.function.arguments or "{}"
     try:
-        args = json.loads(args_str)
-    except json.JSONDecodeError:
+        args = orjson.loads(args_str)
+    except orjson.JSONDecodeError:
         args = {}
 
-    try:
-        server_name, mcp_tool_name = raw_name.split(TOOL_SEPARATOR, 1)
-    except ValueError:
-        return f"Tool name '{raw_name}' does not match the expected format."
-
-    server = servers.get(server_name)
-    if server is None or server.session is None:
-        return f"MCP server '{server_name}' session not found."
+    if server.session is None:
+        return f"MCP server '{server.name}' session not found."
+
+    # The page state is read and updated under the semaphore so that a
+    # cached snapshot is never served ahead of a queued navigation.
+    async with server.semaphore:
+        cache_key: Optional[str] = None
+        page_key = _PAGE_KEYS.get(server.session)
+        if (
+            mcp_tool_name in CACHEABLE_TOOLS
+            and page_key is not None
+            and is_tool_cache_enabled()
+        ):
+            cache_key = make_tool_cache_key(mcp_tool_name, page_key, args)
+            cached = tool_result_cache().get(cache_key)
+            if cached is not None:
+                logger.info("Tool cache hit: %s on %s", raw_name, page_key)
+                return cached
+
+        try:
+            result = await server.session.call_tool(
+                name=mcp_tool_name,
+                arguments=args,
+            )
+        except Exception as exc:  # noqa: BLE001
+            _PAGE_KEYS.pop(server.session, None)
+            return f"Error while executing MCP tool '{raw_name}': {exc!r}"
 
-    try:
-        result = await server.session.call_tool(
-            name=mcp_tool_name,
-            arguments=args,
-        )
-    except Exception as exc:  # noqa: BLE001
-        return f"Error while executing MCP tool '{raw_name}': {exc!r}"
+        _track_page(server.session, mcp_tool_name, args, result)
 
     text = call_result_to_text(result)
     if len(text) > 8000:
         text = text[:8000] + "\n...(output truncated)..."
+
+    if (
+        cache_key is not None
+        and not result.isError
+        and _PAGE_KEYS.get(server.session) == page_key
+    ):
+        tool_result_cache().set(cache_key, text, expire=TOOL_CACHE_TTL_SECONDS)
     return text
@@ -0,0 +1,224 @@
+"""On-demand tool schema loading for the agent loop.
+
+Instead of sending every MCP tool schema to the LLM on each request, the
+agent can expose two small router tools:
+
+- ``list_tools`` returns the available tools, with their argument schemas
+  when filtered by a category.
+- ``call_tool`` validates arguments against the real tool schema and
+  dispatches the call with :func:`dispatch_tool_call`.
+
+This module defines :func:`with_router` to build the router tool set,
+:func:`resolve_call_tool` to find the real tool behind a ``call_tool``
+request, and :func:`dispatch_router_call` to execute router tool calls.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from typing import Any, List, Optional, Tuple
+
+import orjson
+from jsonschema import ValidationError
+from jsonschema.validators import validator_for
+from openai.types.chat import ChatCompletionMessageFunctionToolCall
+
+from .mcp_servers import TOOL_SEPARATOR, ToolsBundle, dispatch_tool_call
+
+LIST_TOOLS_NAME = "list_tools"
+CALL_TOOL_NAME = "call_tool"
+ROUTER_TOOL_NAMES = frozenset({LIST_TOOLS_NAME, CALL_TOOL_NAME})
+
+ROUTER_TOOLS: List[dict] = [
+    {
+        "type": "function",
+        "function": {
+            "name": LIST_TOOLS_NAME,
+            "description": (
+                "List the available browser tools. Without arguments, returns "
+                "each tool's name and description. With `category` (a server "
+                "name such as \"playwright\" or part of a tool name such as "
+                "\"navigate\"), returns the matching tools together with the "
+                "JSON Schema of their arguments. Call this before call_tool."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "category": {
+                        "type": "string",
+                        "description": "Server name or part of a tool name.",
+                    },
+                },
+                "required": [],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": CALL_TOOL_NAME,
+            "description": (
+                "Call a tool returned by list_tools with arguments matching "
+                "its schema."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "Tool name as returned by list_tools.",
+                    },
+                    "args_json": {
+                        "type": "string",
+                        "description": "Tool arguments as a JSON object string.",
+                    },
+                },
+                "required": ["name"],
+            },
+        },
+    },
+]
+
+
+def with_router(tools: ToolsBundle) -> ToolsBundle:
+    """Return a copy of ``tools`` that exposes only the router tools.
+
+    The route table and schemas of the real tools are kept so that
+    :func:`dispatch_router_call` can still reach them.
+
+    Args:
+        tools: Tools collected by
+            :func:`playwright_mcp_agent.mcp_servers.init_servers`.
+
+    Returns:
+        ToolsBundle: Bundle whose :attr:`ToolsBundle.list_form` contains
+        :data:`ROUTER_TOOLS`.
+    """
+    return dataclasses.replace(
+        tools,
+        list_form=ROUTER_TOOLS,
+        json_bytes=orjson.dumps(
+            {"router": ROUTER_TOOLS, "tools": orjson.Fragment(tools.json_bytes)}
+        ),
+    )
+
+
+def _resolve_name(name: str, tools: ToolsBundle) -> Optional[str]:
+    """Resolve ``name`` to a unique tool name, accepting bare MCP names."""
+    if name in tools.schema_by_name:
+        return name
+    matches = [n for n in tools.schema_by_name if n.endswith(TOOL_SEPARATOR + name)]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _router_args(tool_call: Any) -> dict:
+    """Parse the arguments of a router tool call, or return ``{}``."""
+    try:
+        args = orjson.loads(tool_call.function.arguments or "{}")
+    except orjson.JSONDecodeError:
+        return {}
+    return args if isinstance(args, dict) else {}
+
+
+def _tool_args(args: dict) -> Any:
+    """Return the decoded ``args_json`` of a ``call_tool`` request.
+
+    Raises:
+        orjson.JSONDecodeError: If ``args_json`` is a string that is not
+            valid JSON.
+    """
+    tool_args = args.get("args_json") or {}
+    if isinstance(tool_args, str):
+        tool_args = orjson.loads(tool_args)
+    return tool_args
+
+
+def resolve_call_tool(tool_call: Any, tools: ToolsBundle) -> Optional[Tuple[str, Any]]:
+    """Return the real tool name and arguments of a ``call_tool`` request.
+
+    Args:
+        tool_call: A tool call object from the LLM.
+        tools: Bundle holding the real tools' schemas.
+
+    Returns:
+        Optional[Tuple[str, Any]]: The unique tool name and its decoded
+        arguments, or ``None`` if ``tool_call`` is not a ``call_tool``
+        request or names an unknown tool or malformed arguments.
+    """
+    if tool_call.function.name != CALL_TOOL_NAME:
+        return None
+    args = _router_args(tool_call)
+    name = _resolve_name(str(args.get("name", "")), tools)
+    if name is None:
+        return None
+    try:
+        return name, _tool_args(args)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def _list_tools(tools: ToolsBundle, category: Optional[str]) -> str:
+    """Render the tool catalogue returned by ``list_tools``."""
+    if not category:
+        lines = [
+            f"- {name}: {fn.get('description', '')}"
+            for name, fn in tools.schema_by_name.items()
+        ]
+        return "\n".join(lines) or "No tools are available."
+
+    needle = category.lower()
+    matches = [
+        fn for name, fn in tools.schema_by_name.items() if needle in name.lower()
+    ]
+    if not matches:
+        return f"No tools match category '{category}'."
+    return orjson.dumps(matches, option=orjson.OPT_INDENT_2).decode()
+
+
+async def _call_tool(tool_call: Any, tools: ToolsBundle, args: dict) -> str:
+    """Validate and dispatch the tool named in a ``call_tool`` request."""
+    name = _resolve_name(str(args.get("name", "")), tools)
+    if name is None:
+        return (
+            f"Unknown tool '{args.get('name')}'. "
+            f"Use {LIST_TOOLS_NAME} to see the available tools."
+        )
+
+    try:
+        tool_args = _tool_args(args)
+    except orjson.JSONDecodeError as exc:
+        return f"args_json for '{name}' is not valid JSON: {exc}"
+
+    schema = tools.schema_by_name[name]["parameters"]
+    validator = validator_for(schema)(schema)
+    try:
+        validator.validate(tool_args)
+    except ValidationError as exc:
+        return f"Invalid arguments for '{name}': {exc.message}"
+
+    inner = ChatCompletionMessageFunctionToolCall.model_validate(
+        {
+            "id": tool_call.id,
+            "type": "function",
+            "function": {"name": name, "arguments": orjson.dumps(tool_args).decode()},
+        }
+    )
+    return await dispatch_tool_call(inner, tools.route_table)
+
+
+async def dispatch_router_call(tool_call: Any, tools: ToolsBundle) -> str:
+    """Execute a ``list_tools`` or ``call_tool`` call from the LLM.
+
+    Args:
+        tool_call: A tool call object whose function name is in
+            :data:`ROUTER_TOOL_NAMES`.
+        tools: Bundle holding the real tools' schemas and route table.
+
+    Returns:
+        str: Text to send back to the LLM as the ``tool`` message content.
+    """
+    args = _router_args(tool_call)
+    if tool_call.function.name == LIST_TOOLS_NAME:
+        category = args.get("category")
+        return _list_tools(tools, category if isinstance(category, str) else None)
+    return await _call_tool(tool_call, tools, args)